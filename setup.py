@@ -17,6 +17,9 @@ setuptools.setup(
         "Click==7.0",
         "GitPython==2.1.11",
     ],
+    extras_require={
+        "pygit2": ["pygit2"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: Apache Software License",
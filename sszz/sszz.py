@@ -1,19 +1,62 @@
 """Module with main script for Simple SZZ."""
 
+import atexit
+import functools
+import hashlib
+import io
+import itertools
 import logging
-import re
+import os
+import sqlite3
+import subprocess
+import threading
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 import click
 import git
 from git.exc import GitCommandError
 
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
+# Each refactoring check mostly waits on git subprocesses, so threads do scale.
+MAX_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
+# Diffs computed in this process. _diff_cache_lock is only held for dict access;
+# a diff being computed by one thread has an Event in _diff_inflight that other
+# threads asking for the same diff wait on, while different diffs run in parallel.
+_diff_cache = {}
+_diff_inflight = {}
+_diff_cache_lock = threading.Lock()
+
+# Set SSZZ_NO_CACHE (or pass --no-cache) to never read or write the on-disk cache.
+DIFF_STORE_DIR = None if os.environ.get('SSZZ_NO_CACHE') else os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'sszz'
+)
+
+# libgit2 pairs renames differently from git, so diffs computed with pygit2 can
+# count other changes and lead to another commit. Diffs only use it when asked
+# to with SSZZ_PYGIT2 (or --pygit2).
+USE_PYGIT2 = bool(os.environ.get('SSZZ_PYGIT2'))
+
 @click.command()
 @click.option('--repo', prompt=True, default="./", help="Path to the git repository.")
 @click.option('--commit', prompt=True, help="Commit to be analyzed.")
 @click.option('--log', help="Specify log level (DEBUG|INFO|WARNING|ERROR|CRITICAL).")
-def tool(repo, commit, log):
+@click.option('--no-cache', is_flag=True, help="Do not read or write the on-disk diff cache.")
+@click.option('--pygit2', 'use_pygit2', is_flag=True,
+              help="Compute diffs with pygit2 (libgit2 may pair renames differently).")
+def tool(repo, commit, log, no_cache, use_pygit2):
     """CLI to run SZZ for a commit."""
+    global DIFF_STORE_DIR, USE_PYGIT2 # pylint: disable=global-statement
+    if no_cache:
+        DIFF_STORE_DIR = None
+    if use_pygit2:
+        USE_PYGIT2 = True
     if log:
         log_numeric_level = getattr(logging, log.upper())
         logging.basicConfig(level=log_numeric_level)
@@ -26,39 +69,128 @@ def find_refactoring_commit(repo_dir, commit_sha):
         commit_sha,
         repo_dir
     )
-    return next(
-        (future_commit
-         for future_commit in get_all_commits_since(repo_dir, commit_sha)
-         if check_refactoring_has_happened(repo_dir, commit_sha, future_commit)),
-        None
-    )
+    commit_ap = _get_parent_commit(repo_dir, commit_sha)
+    # Changes to files other than the ones changed by commit_sha (and the
+    # names they were renamed to since) add up the same way on both sides of
+    # the check, so every diff can be restricted to these paths.
+    files_a = _get_changed_files(repo_dir, commit_ap, commit_sha)
+    future_commits = _get_candidate_commits(repo_dir, commit_sha, files_a)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        while True:
+            batch = list(itertools.islice(future_commits, MAX_WORKERS))
+            if not batch:
+                return None
+            futures = [
+                executor.submit(
+                    check_refactoring_has_happened,
+                    repo_dir,
+                    commit_sha,
+                    future_commit,
+                    commit_ap=commit_ap,
+                    paths=paths
+                )
+                for future_commit, paths in batch
+            ]
+            for (future_commit, _), future in zip(batch, futures):
+                if future.result():
+                    for pending in futures:
+                        pending.cancel()
+                    return future_commit
 
 def find_refactoring_commit_binary(repo_dir, commit_sha, future_commits=None):
     """Look for a bug fix that blames change induced by this commit (binary search)."""
     if future_commits is None:
-        future_commits = get_all_commits_since(repo_dir, commit_sha)
-    if not future_commits:
-        return None
-    future_commit_index = int((len(future_commits)-1)/2)
-    future_commit = future_commits[future_commit_index]
-    if check_refactoring_has_happened(repo_dir, commit_sha, future_commit):
-        if len(future_commits) == 1:
-            return future_commits[0]
-        future_commits = future_commits[:future_commit_index+1]
-    else:
-        future_commits = future_commits[future_commit_index+1:]
+        future_commits = list(get_all_commits_since(repo_dir, commit_sha))
+    # Invariant: every commit before low is not a refactoring and the commit
+    # at high, if any, is.
+    low, high = 0, len(future_commits)
+    while low < high:
+        middle = (low + high) // 2
+        if check_refactoring_has_happened(repo_dir, commit_sha, future_commits[middle]):
+            high = middle
+        else:
+            low = middle + 1
+    if low < len(future_commits):
+        return future_commits[low]
+    return None
+
+def find_refactoring_commit_galloping(repo_dir, commit_sha):
+    """Look for a bug fix that blames change induced by this commit (galloping search).
+
+    Probes future commits at offsets 1, 2, 4, 8, ... and then binary searches
+    the last window, so the cost grows with the distance to the answer.
+    """
+    pending_commits = get_all_commits_since(repo_dir, commit_sha)
+    future_commits = []
+    previous_index = -1
+    index = 0
+    while True:
+        future_commits.extend(
+            itertools.islice(pending_commits, max(0, index+1-len(future_commits)))
+        )
+        if not future_commits:
+            return None
+        exhausted = len(future_commits) <= index
+        index = min(index, len(future_commits)-1)
+        if check_refactoring_has_happened(repo_dir, commit_sha, future_commits[index]):
+            break
+        if exhausted:
+            return None
+        previous_index = index
+        index = 2*index + 1
     return find_refactoring_commit_binary(
         repo_dir,
         commit_sha,
-        future_commits
+        future_commits[previous_index+1:index+1]
     )
-def check_refactoring_has_happened(repo_dir, commit_a, commit_b):
-    """Check whether, at the moment of commit_b, code from commit_a has been refactored."""
+
+def _get_candidate_commits(repo_dir, commit_sha, files_a):
+    """Yield the commits made after commit_sha that may be the first to refactor it.
+
+    Each commit comes with the sorted paths its diffs must be restricted to:
+    files_a plus every name those files were renamed to up to that commit.
+
+    A descendant of commit_sha that touches none of the files holding its code
+    (files_a, followed through renames) leaves that code as its parents left
+    it, so the refactoring check cannot first flip there and the commit is
+    skipped. Commits that do not descend from commit_sha, e.g. from side
+    branches merged later, are always yielded.
+    """
+    tracked_files = set(files_a)
+    paths = tuple(sorted(tracked_files))
+    descendants = {_resolve_commit(repo_dir, commit_sha)}
+    for commit, parents, file_changes in get_file_changes_since(repo_dir, commit_sha):
+        touches_tracked_files = False
+        for old_path, new_path in file_changes:
+            if old_path in tracked_files or new_path in tracked_files:
+                touches_tracked_files = True
+                if new_path not in tracked_files:
+                    tracked_files.add(new_path)
+                    paths = tuple(sorted(tracked_files))
+        if not descendants.isdisjoint(parents):
+            descendants.add(commit)
+            if not touches_tracked_files:
+                continue
+        yield commit, paths
+
+def check_refactoring_has_happened(repo_dir, commit_a, commit_b,
+                                   changes_ap_to_a=None, commit_ap=None, paths=None):
+    """Check whether, at the moment of commit_b, code from commit_a has been refactored.
+
+    commit_ap (the parent of commit_a) and changes_ap_to_a only depend on
+    commit_a; callers checking many commits_b can compute them once and pass
+    them in. When paths is given, every diff is restricted to those files.
+    """
     logging.info("Checking whether commit %s refactors %s.", commit_b, commit_a)
-    commit_ap = f"{commit_a}^1"
-    changes_ap_to_a = git_compare_commits(repo_dir, commit_ap, commit_a)
-    changes_ap_to_b = git_compare_commits(repo_dir, commit_ap, commit_b)
-    changes_a_to_b = git_compare_commits(repo_dir, commit_a, commit_b)
+    changes_a_to_b = git_compare_commits(repo_dir, commit_a, commit_b, paths=paths)
+    if changes_a_to_b == Changes(0, 0):
+        # Nothing but whitespace changed since commit_a, so nothing was refactored.
+        return False
+    if commit_ap is None:
+        commit_ap = _get_parent_commit(repo_dir, commit_a)
+    if changes_ap_to_a is None:
+        changes_ap_to_a = git_compare_commits(repo_dir, commit_ap, commit_a, paths=paths)
+    changes_ap_to_b = git_compare_commits(repo_dir, commit_ap, commit_b, paths=paths)
     code_was_refactored_between_a_and_b = ((changes_ap_to_a+changes_a_to_b) != changes_ap_to_b)
     code_was_refactored_by_b = code_was_refactored_between_a_and_b
     return code_was_refactored_by_b
@@ -66,13 +198,27 @@ def check_refactoring_has_happened(repo_dir, commit_a, commit_b):
 def check_refactoring_commit(repo_dir, commit_a, commit_b):
     """Check whether commit_b refactors code from commit_a."""
     logging.info("Checking whether commit %s refactors %s.", commit_b, commit_a)
-    commit_ap = f"{commit_a}^1"
-    commit_bp = f"{commit_b}^1"
-    changes_ap_to_a = git_compare_commits(repo_dir, commit_ap, commit_a)
-    changes_ap_to_bp = git_compare_commits(repo_dir, commit_ap, commit_bp)
-    changes_ap_to_b = git_compare_commits(repo_dir, commit_ap, commit_b)
-    changes_a_to_bp = git_compare_commits(repo_dir, commit_a, commit_bp)
-    changes_a_to_b = git_compare_commits(repo_dir, commit_a, commit_b)
+    commit_ap = _get_parent_commit(repo_dir, commit_a)
+    commit_bp = _get_parent_commit(repo_dir, commit_b)
+    commit_pairs = [
+        (commit_ap, commit_a),
+        (commit_ap, commit_b),
+        (commit_a, commit_b),
+    ]
+    # Usually commit_b is a direct child of commit_a. Then commit_bp has the same
+    # tree as commit_a, and the diffs against commit_bp follow from the others.
+    bp_matches_a = _get_tree(repo_dir, commit_bp) == _get_tree(repo_dir, commit_a)
+    if not bp_matches_a:
+        commit_pairs += [
+            (commit_ap, commit_bp),
+            (commit_a, commit_bp),
+        ]
+    changes = _git_compare_commit_pairs(repo_dir, commit_pairs)
+    changes_ap_to_a, changes_ap_to_b, changes_a_to_b = changes[:3]
+    if bp_matches_a:
+        changes_ap_to_bp, changes_a_to_bp = changes_ap_to_a, Changes(0, 0)
+    else:
+        changes_ap_to_bp, changes_a_to_bp = changes[3:]
     code_was_refactored_between_a_and_b = ((changes_ap_to_a+changes_a_to_b) != changes_ap_to_b)
     code_was_refactored_between_a_and_bp = ((changes_ap_to_a+changes_a_to_bp) != changes_ap_to_bp)
     code_was_refactored_by_b = (
@@ -85,6 +231,8 @@ def check_refactoring_commit(repo_dir, commit_a, commit_b):
 
 class Changes(namedtuple('Changes', ['insertions', 'deletions'])):
     """Class to compare changes between commits."""
+    __slots__ = ()
+
     def __add__(self, other):
         return Changes(
             self.insertions+other.insertions,
@@ -96,45 +244,396 @@ class Changes(namedtuple('Changes', ['insertions', 'deletions'])):
             self.deletions-other.deletions
         )
 
-def git_compare_commits(repo_dir, commit_a, commit_b):
-    "Get number of files changes, insertions and deletions between two commits."
-    git_caller = git.cmd.Git(repo_dir)
+def git_compare_commits(repo_dir, commit_a, commit_b, paths=None):
+    """Get number of files changes, insertions and deletions between two commits.
+
+    If paths is given, only changes to those files are counted.
+    """
+    paths = tuple(sorted(paths)) if paths else None
+    key = (repo_dir, commit_a, commit_b, paths)
+    while True:
+        with _diff_cache_lock:
+            if key in _diff_cache:
+                return _diff_cache[key]
+            inflight = _diff_inflight.get(key)
+            if inflight is None:
+                inflight = _diff_inflight[key] = threading.Event()
+                break
+        # If the other thread fails, nothing is cached and we try ourselves.
+        inflight.wait()
     try:
-        result = git_caller.execute(
-            ['git', 'diff', '-w', '--shortstat', commit_a, commit_b]
+        changes = _compute_changes(repo_dir, commit_a, commit_b, paths)
+        with _diff_cache_lock:
+            _diff_cache[key] = changes
+    finally:
+        with _diff_cache_lock:
+            del _diff_inflight[key]
+        inflight.set()
+    return changes
+
+def _compute_changes(repo_dir, commit_a, commit_b, paths):
+    tree_a = _get_tree(repo_dir, commit_a)
+    tree_b = _get_tree(repo_dir, commit_b)
+    diff_store = _get_diff_store(repo_dir)
+    changes = None
+    if tree_a == tree_b:
+        changes = Changes(0, 0)
+    elif diff_store is not None:
+        changes = diff_store.get(tree_a, tree_b, paths)
+    if changes is None:
+        changes = _git_compare_commits(repo_dir, commit_a, commit_b, paths)
+        if diff_store is not None:
+            diff_store.put(tree_a, tree_b, paths, changes)
+    return changes
+
+def _git_compare_commit_pairs(repo_dir, commit_pairs):
+    """Run git_compare_commits for independent pairs at once, in input order."""
+    with ThreadPoolExecutor(max_workers=len(commit_pairs)) as executor:
+        return list(executor.map(
+            lambda commit_pair: git_compare_commits(repo_dir, *commit_pair),
+            commit_pairs
+        ))
+
+def _git_compare_commits(repo_dir, commit_a, commit_b, paths=None):
+    if _use_pygit2_diffs():
+        return _pygit2_compare_commits(repo_dir, commit_a, commit_b, paths)
+    # Called for every diff: skip GitPython's command dispatch and output handling,
+    # and diff the trees with plumbing so git skips all commit-level work. -M
+    # keeps the rename detection that `git diff` enables by default. Paths are
+    # plain file names, not patterns.
+    tree_a = _get_tree(repo_dir, commit_a)
+    tree_b = _get_tree(repo_dir, commit_b)
+    try:
+        result = subprocess.run(
+            ['git', '-C', repo_dir, '--literal-pathspecs', 'diff-tree', '-r', '-M', '-w',
+             '--numstat', tree_a, tree_b, '--', *(paths or [])],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True
+        )
+    except subprocess.CalledProcessError as git_error:
+        logging.error(
+            "%s\n  stderr: %s",
+            git_error,
+            git_error.stderr.decode(errors='replace').strip()
+        )
+        raise SSZZException
+    return _parse_numstat(result.stdout)
+
+def _parse_numstat(output):
+    """Sum up the b"<insertions>\t<deletions>\t<path>" lines of git --numstat."""
+    insertions = deletions = 0
+    for line in output.splitlines():
+        file_insertions, file_deletions, _ = line.split(b'\t', 2)
+        # Binary files are reported as "-\t-\t<path>".
+        if file_insertions != b'-':
+            insertions += int(file_insertions)
+        if file_deletions != b'-':
+            deletions += int(file_deletions)
+    return Changes(insertions, deletions)
+
+@functools.lru_cache(maxsize=8)
+def _get_git(repo_dir):
+    return git.cmd.Git(repo_dir)
+
+def _use_pygit2_diffs():
+    if not USE_PYGIT2:
+        return False
+    if pygit2 is None:
+        logging.error("Diffs with pygit2 were requested, but pygit2 is not installed.")
+        raise SSZZException
+    return True
+
+@functools.lru_cache(maxsize=8)
+def _get_pygit2_repository(repo_dir):
+    return pygit2.Repository(pygit2.discover_repository(repo_dir))
+
+def _pygit2_compare_commits(repo_dir, commit_a, commit_b, paths=None):
+    """Compare two commits in-process with libgit2, without forking git.
+
+    Ignores whitespace like `git diff -w` and detects renames, but libgit2
+    does not always pair renamed files the way git does, so the counts can
+    differ from the git backend. Like a git pathspec, restricting the diff to
+    paths hides renames from or to files outside of them: such a rename
+    counts as the file inside paths being added or deleted.
+    """
+    repository = _get_pygit2_repository(repo_dir)
+    diff = repository.diff(
+        repository[_get_tree(repo_dir, commit_a)],
+        repository[_get_tree(repo_dir, commit_b)],
+        flags=pygit2.GIT_DIFF_IGNORE_WHITESPACE
+    )
+    diff.find_similar()
+    if not paths:
+        stats = diff.stats
+        return Changes(stats.insertions, stats.deletions)
+    paths = set(paths)
+    insertions = deletions = 0
+    for delta_index, delta in enumerate(diff.deltas):
+        old_in_paths = delta.old_file.path in paths
+        new_in_paths = delta.new_file.path in paths
+        if old_in_paths and new_in_paths:
+            _, file_insertions, file_deletions = diff[delta_index].line_stats
+            insertions += file_insertions
+            deletions += file_deletions
+        elif old_in_paths:
+            deletions += _count_blob_lines(repository[delta.old_file.id])
+        elif new_in_paths:
+            insertions += _count_blob_lines(repository[delta.new_file.id])
+    return Changes(insertions, deletions)
+
+def _count_blob_lines(blob):
+    # Like --numstat, binary files count as no lines.
+    if blob.is_binary:
+        return 0
+    data = blob.data
+    return data.count(b'\n') + (bool(data) and not data.endswith(b'\n'))
+
+@functools.lru_cache(maxsize=None)
+def _get_tree(repo_dir, commit_sha):
+    """Resolve a commit to the SHA of its tree, once per commit."""
+    if pygit2 is not None:
+        try:
+            commit = _get_pygit2_repository(repo_dir).revparse_single(commit_sha)
+            return str(commit.peel(pygit2.Tree).id)
+        except (KeyError, ValueError, pygit2.GitError) as git_error:
+            logging.error(str(git_error))
+            raise SSZZException
+    try:
+        return _get_git(repo_dir).execute(
+            ['git', 'rev-parse', '--verify', f"{commit_sha}^{{tree}}"]
         )
     except GitCommandError as git_error:
         logging.error(str(git_error))
         raise SSZZException
-    # files_changed = _get_numeric_var_from_regex_match("(\d+) files? changed", result)
-    insertions = _get_numeric_var_from_regex_match(r"(\d+) insertions?\(\+\)", result)
-    deletions = _get_numeric_var_from_regex_match(r"(\d+) deletions?\(-\)", result)
-    return Changes(insertions, deletions)
 
-def _get_numeric_var_from_regex_match(pattern, string):
-    match = re.search(pattern, string)
-    if match:
-        return int(match.group(1))
-    return 0
+class _DiffStore:
+    """Diffs between trees persisted in sqlite, so they are reused across runs.
+
+    Trees are content-addressed, so a stored diff never goes stale. Diffs
+    restricted to a set of paths are keyed by a digest of those paths, and
+    every diff by the backend that computed it, since git and libgit2 may
+    pair renames differently.
+    """
+    FLUSH_EVERY = 256
+    SCHEMA_VERSION = 3
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        # New rows are kept here and written in one short transaction, so the
+        # database is never left locked for other threads or sszz processes.
+        self._pending = {}
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        schema_version, = self._connection.execute('PRAGMA user_version').fetchone()
+        if schema_version != self.SCHEMA_VERSION:
+            self._connection.execute('DROP TABLE IF EXISTS diff')
+            self._connection.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS diff ('
+            'a TEXT, b TEXT, paths TEXT, backend TEXT, ins INT, del INT, '
+            'PRIMARY KEY(a, b, paths, backend))'
+        )
+        self._connection.commit()
+        atexit.register(self.flush)
+
+    @staticmethod
+    def _key(tree_a, tree_b, paths):
+        paths_key = hashlib.sha1('\0'.join(paths).encode()).hexdigest() if paths else ''
+        return (tree_a, tree_b, paths_key, _get_diff_backend())
+
+    def get(self, tree_a, tree_b, paths):
+        key = self._key(tree_a, tree_b, paths)
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+            try:
+                row = self._connection.execute(
+                    'SELECT ins, del FROM diff '
+                    'WHERE a = ? AND b = ? AND paths = ? AND backend = ?',
+                    key
+                ).fetchone()
+            except sqlite3.Error as error:
+                logging.warning("Could not read the diff cache: %s", error)
+                return None
+        if row is None:
+            return None
+        return Changes(*row)
+
+    def put(self, tree_a, tree_b, paths, changes):
+        with self._lock:
+            self._pending[self._key(tree_a, tree_b, paths)] = changes
+            if len(self._pending) >= self.FLUSH_EVERY:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        try:
+            with self._connection:
+                self._connection.executemany(
+                    'INSERT OR REPLACE INTO diff VALUES (?, ?, ?, ?, ?, ?)',
+                    [(*key, *changes) for key, changes in self._pending.items()]
+                )
+        except sqlite3.Error as error:
+            logging.warning("Could not write the diff cache: %s", error)
+        self._pending = {}
+
+def _get_diff_backend():
+    """Name and version of the backend computing diffs."""
+    if _use_pygit2_diffs():
+        return f"libgit2 {pygit2.LIBGIT2_VERSION}"
+    return _get_git_version()
+
+@functools.lru_cache(maxsize=None)
+def _get_git_version():
+    return subprocess.run(
+        ['git', 'version'], stdout=subprocess.PIPE, universal_newlines=True, check=True
+    ).stdout.strip()
+
+_diff_stores_lock = threading.Lock()
+
+def _get_diff_store(repo_dir):
+    """Open the on-disk diff cache for a repository, or None if it cannot be used."""
+    # Worker threads ask for the store concurrently; open it only once.
+    with _diff_stores_lock:
+        return _open_diff_store(repo_dir)
+
+@functools.lru_cache(maxsize=8)
+def _open_diff_store(repo_dir):
+    if DIFF_STORE_DIR is None:
+        return None
+    repo_id = hashlib.sha1(os.path.realpath(repo_dir).encode()).hexdigest()
+    try:
+        os.makedirs(DIFF_STORE_DIR, exist_ok=True)
+        return _DiffStore(os.path.join(DIFF_STORE_DIR, f"{repo_id}.sqlite"))
+    except (OSError, sqlite3.Error) as error:
+        logging.warning("Diff cache disabled: %s", error)
+        return None
+
 def _add_tuples(tuple_1, tuple_2):
     return tuple(sum(values) for values in zip(tuple_1, tuple_2))
 
-def get_all_commits_since(repo_dir, commit_sha):
-    """Get a list of all commits made after the given commit."""
-    #git log --pretty='%H' 10edd33598c80b6e9453bd8c0117b29f004837d3..HEAD
+@functools.lru_cache(maxsize=None)
+def _resolve_commit(repo_dir, commit_sha):
+    """Resolve a possibly abbreviated commit to its full SHA."""
     try:
-        git_caller = git.cmd.Git(repo_dir)
-        output = git_caller.execute(
-            ['git', 'log', "--pretty=%H", f"{commit_sha}..HEAD"]
+        return _get_git(repo_dir).execute(
+            ['git', 'rev-parse', '--verify', f"{commit_sha}^{{commit}}"]
         )
-        return output.split('\n')[::-1]
-    except GitCommandError as git_error:
-        _, _, error_message, *_ = git_error.args
-        if "Invalid revision range" in error_message.decode():
+    except GitCommandError:
+        raise CommitNotFound()
+
+@functools.lru_cache(maxsize=None)
+def _get_parent_commit(repo_dir, commit_sha):
+    """Resolve the first parent of a commit to its full SHA, once per commit."""
+    if pygit2 is not None:
+        try:
+            commit = _get_pygit2_repository(repo_dir).revparse_single(commit_sha)
+            parents = [str(parent_id) for parent_id in commit.peel(pygit2.Commit).parent_ids]
+        except (KeyError, ValueError, pygit2.GitError):
+            raise CommitNotFound()
+    else:
+        try:
+            _, *parents = _get_git(repo_dir).execute(
+                ['git', 'rev-list', '--parents', '-n', '1', commit_sha]
+            ).split()
+        except GitCommandError:
             raise CommitNotFound()
+    if not parents:
+        raise CommitWithoutParent()
+    return parents[0]
+
+def get_all_commits_since(repo_dir, commit_sha):
+    """Yield all commits made after the given commit, oldest first.
+
+    Commits are streamed from git log as they are produced, so callers can
+    start checking them before the whole history has been read.
+    """
+    yield from _iter_git_log(repo_dir, ['--reverse', '--pretty=%H', f"{commit_sha}..HEAD"])
+
+def get_file_changes_since(repo_dir, commit_sha):
+    """Yield (commit, parents, file_changes) for all commits made after the given commit.
+
+    Commits come oldest first, streamed like in get_all_commits_since.
+    file_changes lists the (old_path, new_path) pair of every changed file, so
+    renames can be followed. Merge commits list their changes with respect to
+    every parent.
+    """
+    # With -z, names are not quoted and every field ends with a NUL. Each
+    # commit starts with empty fields, then "<commit> <parents>\n<status>",
+    # followed by the paths of that status and further status/paths fields.
+    fields = _iter_git_log(repo_dir, ['--reverse', '-m', '-M', '--name-status', '-z',
+                                      '--pretty=format:%x00%H %P', f"{commit_sha}..HEAD"],
+                           separator=b'\0')
+    commit = None
+    at_header = False
+    for field in fields:
+        if not field:
+            at_header = True
+            continue
+        if at_header:
+            at_header = False
+            header, _, status = field.partition('\n')
+            header_commit, *header_parents = header.split()
+            # With -m, a merge is repeated once per parent.
+            if header_commit != commit:
+                if commit is not None:
+                    yield commit, parents, file_changes
+                commit, parents, file_changes = header_commit, header_parents, []
+            if not status:
+                continue
         else:
-            raise git_error
+            status = field
+        old_path = new_path = next(fields)
+        # Renames and copies list the old and the new path.
+        if status[0] in 'RC':
+            new_path = next(fields)
+        file_changes.append((old_path, new_path))
+    if commit is not None:
+        yield commit, parents, file_changes
 
+def _iter_git_log(repo_dir, args, separator=b'\n'):
+    """Stream the output of git log, split on separator and decoded like file names."""
+    command = ['git', '-C', repo_dir, 'log', *args]
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    try:
+        pending = b''
+        for chunk in iter(lambda: process.stdout.read1(io.DEFAULT_BUFFER_SIZE), b''):
+            *records, pending = (pending + chunk).split(separator)
+            yield from map(os.fsdecode, records)
+        if pending:
+            yield os.fsdecode(pending)
+        _, error_message = process.communicate()
+        error_message = error_message.decode(errors='replace')
+    finally:
+        # Callers usually stop iterating as soon as they find a commit.
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.stderr.close()
+        process.wait()
+    if process.returncode:
+        if "Invalid revision range" in error_message:
+            raise CommitNotFound()
+        raise GitCommandError(command, process.returncode, error_message)
+
+def _get_changed_files(repo_dir, commit_a, commit_b):
+    """Get the set of files changed between two commits."""
+    try:
+        # -z keeps git from quoting names with special characters.
+        output = _get_git(repo_dir).execute(
+            ['git', 'diff', '--no-renames', '--name-only', '-z', commit_a, commit_b]
+        )
+    except GitCommandError as git_error:
+        logging.error(str(git_error))
+        raise SSZZException
+    return set(filter(None, output.split('\0')))
 
 
 class SSZZException(Exception):
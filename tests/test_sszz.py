@@ -0,0 +1,78 @@
+"""Tests for Simple SZZ, run against scratch git repositories."""
+
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from sszz import sszz
+
+
+class ScratchRepoTestCase(unittest.TestCase):
+    """Builds a fresh git repository for each test."""
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.repo_dir = temp_dir.name
+        self._git('init', '-q')
+        # Keep test runs out of the user's diff cache.
+        patcher = mock.patch.object(sszz, 'DIFF_STORE_DIR', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _git(self, *args):
+        return subprocess.run(
+            ['git', '-C', self.repo_dir, '-c', 'user.name=sszz', '-c', 'user.email=sszz@test',
+             *args],
+            stdout=subprocess.PIPE,
+            check=True,
+            universal_newlines=True
+        ).stdout.strip()
+
+    def commit(self, message, files):
+        """Write the given {path: content} files and commit them."""
+        for path, content in files.items():
+            with open(os.path.join(self.repo_dir, path), 'w', encoding='utf-8') as file:
+                file.write(content)
+        self._git('add', '-A')
+        self._git('commit', '-q', '-m', message)
+        return self._git('rev-parse', 'HEAD')
+
+
+class TestGetFileChangesSince(ScratchRepoTestCase):
+
+    def test_non_ascii_rename(self):
+        commit_a = self.commit('A', {'é.py': 'a\nb\nc\n'})
+        self._git('mv', 'é.py', 'ü y.py')
+        self._git('commit', '-q', '-m', 'rename')
+        commit_b = self.commit('B', {'ü y.py': 'a\nb\nC\n'})
+        self.assertEqual(
+            [(commit, file_changes)
+             for commit, _, file_changes in sszz.get_file_changes_since(self.repo_dir, commit_a)],
+            [(self._git('rev-parse', 'HEAD^'), [('é.py', 'ü y.py')]),
+             (commit_b, [('ü y.py', 'ü y.py')])]
+        )
+
+
+class TestFindRefactoringCommit(ScratchRepoTestCase):
+
+    def test_non_ascii_file_name(self):
+        self.commit('init', {'é.py': 'a\nb\n', 'other.py': 'x\n'})
+        commit_a = self.commit('A', {'é.py': 'a\nb\nc\n'})
+        self.commit('unrelated', {'other.py': 'y\n'})
+        commit_b = self.commit('B', {'é.py': 'a\nb\nC\nd\n'})
+        self.assertEqual(sszz._get_changed_files(self.repo_dir, commit_a + '^', commit_a),
+                         {'é.py'})
+        self.assertEqual(sszz.find_refactoring_commit(self.repo_dir, commit_a), commit_b)
+        if sszz.pygit2 is None:
+            return
+        # Again with the pygit2 backend, without reusing the diffs above.
+        with mock.patch.object(sszz, 'USE_PYGIT2', True), \
+                mock.patch.dict(sszz._diff_cache, clear=True):
+            self.assertEqual(sszz.find_refactoring_commit(self.repo_dir, commit_a), commit_b)
+
+
+if __name__ == '__main__':
+    unittest.main()